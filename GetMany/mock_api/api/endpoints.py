@@ -1,63 +1,169 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, Response
 from typing import Optional
+import base64
+import bisect
+import binascii
 import datetime
-import uuid
+import json
+import orjson
+from pydantic import TypeAdapter, ValidationError
+import secrets
+import time
 
 from models.models import (
     SearchConfig,
     CreateJobSearchRequest,
-    AgencyStats
+    AgencyStats,
+    dump_model
 )
 from data import mock_data
+from api.middleware import PrebuiltResponse, with_etag
 
 router = APIRouter()
 
+# Request bodies are validated straight from the raw bytes with prebuilt adapters.
+_CREATE_JOB_SEARCH_ADAPTER = TypeAdapter(CreateJobSearchRequest)
+_SEARCH_CONFIG_ADAPTER = TypeAdapter(SearchConfig)
+
+def _validate_body(adapter: TypeAdapter, body: bytes):
+    try:
+        return adapter.validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+        ) from exc
+
+def _body_openapi(model: type) -> dict:
+    """OpenAPI requestBody for routes that read the raw body instead of declaring a model param."""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": inline(schema)}}}}
+
+MAX_PAGE_SIZE = 100
+
+# Static payloads are serialized once at import and served as-is.
+# Clients and intermediate caches may reuse these for STATIC_MAX_AGE seconds
+# before revalidating with If-None-Match.
+STATIC_MAX_AGE = 60
+
+def _static_response(payload: dict) -> PrebuiltResponse:
+    response = ORJSONResponse(payload, headers={"cache-control": f"public, max-age={STATIC_MAX_AGE}"})
+    return PrebuiltResponse(with_etag(response))
+
+_AGENCY_RESP = _static_response(mock_data.agency_details)
+_PROPOSALS_RESP = _static_response({"data": mock_data.agency_proposals})
+_SAMPLE_RESP = PrebuiltResponse(ORJSONResponse({"count": len(mock_data.job_candidates), "data": mock_data.job_candidates}))
+
+def _build_stats_response(stats: dict) -> PrebuiltResponse:
+    return _static_response({"data": AgencyStats(**stats).model_dump(exclude_none=True)})
+
+_STATS_RESP = _build_stats_response(mock_data.agency_stats)
+_STATS_WITH_CR_RESP = _build_stats_response(mock_data.agency_stats_with_conversion)
+
+# [iso string, epoch second it was formatted for]
+_ts_cache = ["", 0]
+
+def _iso_now() -> str:
+    now = int(time.time())
+    if now != _ts_cache[1]:
+        _ts_cache[0] = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        _ts_cache[1] = now
+    return _ts_cache[0]
+
+def _new_search_id() -> str:
+    # Same 8-4-4-4-12 v4 layout as str(uuid.uuid4()), without building a UUID object.
+    h = secrets.token_hex(16)
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+
+def _encode_cursor(candidate: dict) -> str:
+    raw = json.dumps([candidate["createdAt"], candidate["uid"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, uid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pageCursor") from None
+    return str(created_at), str(uid)
+
+def _to_feed_timestamp(value: datetime.datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
 @router.get("/agency")
-def get_agency():
-    return mock_data.agency_details
-
-@router.get("/agency/stats", response_model=dict)
-def get_agency_stats(from_date: Optional[datetime.date] = None, to_date: Optional[datetime.date] = None, include: Optional[str] = None):
-    if from_date is None:
-        from_date = datetime.date.today() - datetime.timedelta(days=30)
-    if to_date is None:
-        to_date = datetime.date.today()
-
-    stats = AgencyStats(**mock_data.agency_stats)
-
-    if include == "conversion_rate" and stats.sent > 0:
-        stats.conversionRate = round((stats.hired / stats.sent) * 100, 2)
-    
-    return {"data": stats.model_dump(exclude_none=True)}
-
-@router.get("/job-searches/{id}/feed", response_model=dict)
-def get_job_searches_by_id_feed(id: str, pageCursor: Optional[str] = None, pageSize: Optional[int] = 10, since: Optional[datetime.datetime] = None):
-    """This endpoint mocks the 'Search job candidates' functionality."""
-    return {"data": mock_data.job_candidates}
-
-@router.get("/agency/proposals", response_model=dict)
-def get_agency_proposals():
+async def get_agency():
+    return _AGENCY_RESP()
+
+@router.get("/agency/stats")
+async def get_agency_stats(from_date: Optional[datetime.date] = None, to_date: Optional[datetime.date] = None, include: Optional[str] = None):
+    # The mock stats are not windowed, so from_date/to_date are accepted but unused.
+    return _STATS_WITH_CR_RESP() if include == "conversion_rate" else _STATS_RESP()
+
+@router.get("/job-searches/{id}/feed")
+async def get_job_searches_by_id_feed(id: str, pageCursor: Optional[str] = None, pageSize: int = Query(10, ge=1, le=MAX_PAGE_SIZE, description=f"Number of candidates per page (at most {MAX_PAGE_SIZE})."), since: Optional[datetime.datetime] = None):
+    """This endpoint mocks the 'Search job candidates' functionality.
+
+    Results are ordered newest first and paginated with an opaque cursor over
+    (createdAt, uid); pass the returned nextCursor as pageCursor for the next page.
+    """
+    pageSize = min(pageSize, MAX_PAGE_SIZE)
+    keys = mock_data.job_candidate_keys
+    total = len(keys)
+
+    start = 0
+    if pageCursor:
+        start = total - bisect.bisect_left(keys, _decode_cursor(pageCursor))
+    end = total
+    if since is not None:
+        end = total - bisect.bisect_left(keys, (_to_feed_timestamp(since), ""))
+
+    stop = max(start, min(start + pageSize, end))
+    next_cursor = None
+    if start < stop < end:
+        next_cursor = _encode_cursor(mock_data.job_candidates_sorted[stop - 1])
+    body = b"".join((
+        b'{"data":[',
+        b",".join(mock_data.job_candidate_blobs[start:stop]),
+        b'],"nextCursor":',
+        orjson.dumps(next_cursor),
+        b"}",
+    ))
+    return Response(content=body, media_type="application/json")
+
+@router.get("/agency/proposals")
+async def get_agency_proposals():
     """This is a new mock endpoint to pull agency proposals."""
-    return {"data": mock_data.agency_proposals}
+    return _PROPOSALS_RESP()
 
-@router.post("/job-searches", status_code=201)
-def create_job_search(search_request: CreateJobSearchRequest):
-    search_id = str(uuid.uuid4())
+@router.post("/job-searches", status_code=201, openapi_extra=_body_openapi(CreateJobSearchRequest))
+async def create_job_search(request: Request):
+    search_request = _validate_body(_CREATE_JOB_SEARCH_ADAPTER, await request.body())
+    search_id = _new_search_id()
     new_search = {
         "id": search_id,
         "name": search_request.name,
-        "updatedAt": datetime.datetime.now().isoformat(),
+        "updatedAt": _iso_now(),
         "bidder": {"status": "not_configured", "mode": None},
-        "searchConfig": search_request.searchConfig.model_dump()
+        "searchConfig": dump_model(search_request.searchConfig)
     }
     mock_data.job_searches_db[search_id] = new_search
     return {"data": new_search}
 
-@router.post("/job-searches/sample")
-def get_job_search_sample(search_config: SearchConfig):
+@router.post("/job-searches/sample", openapi_extra=_body_openapi(SearchConfig))
+async def get_job_search_sample(request: Request):
     """Mocks getting a sample of jobs for a given search configuration."""
-    sample_jobs = get_job_searches_by_id_feed(id="sample")
-    return {
-        "count": len(sample_jobs["data"]),
-        "data": sample_jobs["data"]
-    }
+    _validate_body(_SEARCH_CONFIG_ADAPTER, await request.body())
+    return _SAMPLE_RESP()
@@ -0,0 +1,118 @@
+import xxhash
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def compute_etag(body: bytes) -> str:
+    # Weak, because GZipMiddleware sends the same ETag on the gzip and identity forms
+    return f'W/"{xxhash.xxh64(body).hexdigest()}"'
+
+
+def with_etag(response: Response) -> Response:
+    """Stamps a prebuilt response with its ETag so the middleware never has to hash it."""
+    response.headers["etag"] = compute_etag(response.body)
+    return response
+
+
+class PrebuiltResponse:
+    """Body and headers of a response serialized once, served as a new Response per call.
+
+    Middleware such as GZipMiddleware edits a response's headers in place, so a
+    single Response instance must never be sent twice.
+    """
+
+    __slots__ = ("body", "status_code", "headers")
+
+    def __init__(self, response: Response):
+        self.body = response.body
+        self.status_code = response.status_code
+        self.headers = dict(response.headers)
+
+    def __call__(self) -> Response:
+        return Response(content=self.body, status_code=self.status_code, headers=self.headers)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored on both sides
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+# Headers a 304 must repeat from the 200 so caches keep the same freshness and variants
+_NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "expires", "vary")
+
+
+def _not_modified_headers(headers: Headers, etag: str) -> dict:
+    not_modified = {name: headers[name] for name in _NOT_MODIFIED_HEADERS if name in headers}
+    not_modified["etag"] = etag
+    return not_modified
+
+
+class ETagMiddleware:
+    """Adds an ETag to successful GET responses and answers matching If-None-Match with 304.
+
+    Written as plain ASGI so a wrapping GZipMiddleware still receives the body as
+    one message with its Content-Length and can skip bodies under minimum_size.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start_message: Message = {}
+        body_parts: list[bytes] = []
+        # "buffer" until the start message shows whether the body has to be hashed
+        mode = "buffer"
+
+        def _matches(etag: str) -> bool:
+            return bool(if_none_match) and _etag_matches(if_none_match, etag)
+
+        async def send_with_etag(message: Message) -> None:
+            nonlocal start_message, mode
+            if mode == "passthrough":
+                await send(message)
+            elif mode == "discard":
+                # A 304 has already been sent in place of this response
+                pass
+            elif message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                etag = headers.get("etag")
+                if message["status"] != 200 or (etag is not None and not _matches(etag)):
+                    mode = "passthrough"
+                    await send(message)
+                elif etag is not None:
+                    # Prebuilt responses carry their ETag, so their body is never hashed
+                    mode = "discard"
+                    await _send_not_modified(send, headers, etag)
+                else:
+                    start_message = message
+            else:
+                body_parts.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = b"".join(body_parts)
+                etag = compute_etag(body)
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                if _matches(etag):
+                    await _send_not_modified(send, headers, etag)
+                    return
+                headers["etag"] = etag
+                headers["content-length"] = str(len(body))
+                await send({**start_message, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
+
+
+async def _send_not_modified(send: Send, headers: Headers, etag: str) -> None:
+    response = Response(status_code=304, headers=_not_modified_headers(headers, etag))
+    await send({"type": "http.response.start", "status": 304, "headers": response.raw_headers})
+    await send({"type": "http.response.body", "body": b""})
@@ -1,5 +1,12 @@
-# In-memory storage for created job searches
-job_searches_db = {}
+import orjson
+from cachetools import LRUCache
+
+# In-memory storage for created job searches. Bounded so repeated POSTs cannot
+# grow the process without limit; the least recently used search is evicted
+# once JOB_SEARCHES_MAX_ENTRIES is reached. Writes happen on the event loop
+# only, so no lock is needed, but each uvicorn worker keeps its own cache.
+JOB_SEARCHES_MAX_ENTRIES = 10_000
+job_searches_db = LRUCache(maxsize=JOB_SEARCHES_MAX_ENTRIES)
 
 agency_details = {
     "data": {
@@ -18,6 +25,11 @@ agency_stats = {
     "hired": 7
 }
 
+# Derived aggregates are computed once here rather than per request.
+agency_stats_with_conversion = dict(agency_stats)
+if agency_stats["sent"] > 0:
+    agency_stats_with_conversion["conversionRate"] = round(agency_stats["hired"] / agency_stats["sent"] * 100, 2)
+
 job_candidates = [
     {
         "uid": "job_12345",
@@ -51,6 +63,13 @@ job_candidates = [
     }
 ]
 
+# Feed order is newest first; ties on createdAt are broken by uid.
+job_candidates_sorted = sorted(job_candidates, key=lambda j: (j["createdAt"], j["uid"]), reverse=True)
+# Ascending sort keys for bisecting into job_candidates_sorted.
+job_candidate_keys = [(j["createdAt"], j["uid"]) for j in reversed(job_candidates_sorted)]
+# Pre-serialized rows of job_candidates_sorted; feed pages are joined from these.
+job_candidate_blobs = tuple(orjson.dumps(j) for j in job_candidates_sorted)
+
 agency_proposals = [
     {
         "id": "prop_abcde",
@@ -1,16 +1,37 @@
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from api.endpoints import router as api_router
+from api.middleware import ETagMiddleware, PrebuiltResponse, with_etag
 
 app = FastAPI(
     title="Getmany Mock Service API",
     description="This is a mock API for the Getmany Service for n8n workflow development.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+app.add_middleware(ETagMiddleware)
+# Added last so it wraps ETagMiddleware and ETags are computed on the uncompressed body.
+app.add_middleware(GZipMiddleware, minimum_size=500)
 app.include_router(api_router, prefix="/v1")
 
+# Build and serialize the OpenAPI schema once at startup, replacing FastAPI's
+# lazy /openapi.json route, which re-encodes the schema on every hit.
+_OPENAPI_RESP = PrebuiltResponse(with_etag(ORJSONResponse(app.openapi())))
+app.router.routes = [route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url]
+
+@app.get(app.openapi_url, include_in_schema=False)
+async def openapi_json():
+    return _OPENAPI_RESP()
+
 if __name__ == "__main__":
+    import os
+
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+
+    # Each worker is a separate process with its own copy of mock_data.job_searches_db.
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=8001, loop="uvloop", http="httptools", workers=workers)
 
 
@@ -1,10 +1,22 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Union, get_args, get_origin
 import datetime
 
+class NumericRange(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class CountryCode(BaseModel):
+    code: str
+    name: Optional[str] = None
+
+class LanguageSpec(BaseModel):
+    code: str
+    name: Optional[str] = None
+
 class JobFeedBudget(BaseModel):
     fixedBudget: Optional[float] = None
-    hourlyRate: Optional[dict] = None
+    hourlyRate: Optional[NumericRange] = None
 
 class JobFeedClient(BaseModel):
     country_code: str
@@ -48,10 +60,10 @@ class AgencyStats(BaseModel):
 
 class BudgetPrefs(BaseModel):
     allowUnspecifiedBudget: Optional[bool] = None
-    avgHourlyRate: Optional[dict] = None
-    hourlyRate: Optional[dict] = None
-    connectsPrice: Optional[dict] = None
-    fixedPrice: Optional[dict] = None
+    avgHourlyRate: Optional[NumericRange] = None
+    hourlyRate: Optional[NumericRange] = None
+    connectsPrice: Optional[NumericRange] = None
+    fixedPrice: Optional[NumericRange] = None
     jobDurations: List[str] = Field(default_factory=list)
     hourlyWorkloads: List[str] = Field(default_factory=list)
     noAvgHourlyRatePaid: Optional[bool] = None
@@ -61,11 +73,11 @@ class BudgetPrefs(BaseModel):
 
 class ClientPrefs(BaseModel):
     companySizeRange: List[str] = Field(default_factory=list)
-    descriptionLanguage: Optional[dict] = None
-    excludeCountryCodes: List[dict] = Field(default_factory=list)
+    descriptionLanguage: Optional[LanguageSpec] = None
+    excludeCountryCodes: List[CountryCode] = Field(default_factory=list)
     excludeIndustry: List[str] = Field(default_factory=list)
     hireHistory: List[str] = Field(default_factory=list)
-    includeCountryCodes: List[dict] = Field(default_factory=list)
+    includeCountryCodes: List[CountryCode] = Field(default_factory=list)
     includeIndustry: List[str] = Field(default_factory=list)
     includeWithNoFeedback: Optional[bool] = None
     maxTotalSpent: Optional[int] = None
@@ -79,7 +91,7 @@ class VendorPrefs(BaseModel):
     englishProficiency: Optional[str] = None
     excludeWithQuestions: Optional[bool] = None
     experienceLevel: List[str] = Field(default_factory=list)
-    includeCountryCodes: List[dict] = Field(default_factory=list)
+    includeCountryCodes: List[CountryCode] = Field(default_factory=list)
     includeFeatured: Optional[bool] = None
     includeWithoutCountryPreference: Optional[bool] = None
     languages: List[str] = Field(default_factory=list)
@@ -97,3 +109,59 @@ class SearchConfig(BaseModel):
 class CreateJobSearchRequest(BaseModel):
     name: str
     searchConfig: SearchConfig
+
+def _is_model(annotation) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+def _unwrap_optional(annotation):
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+def _make_dumper(model_cls: type[BaseModel]) -> Callable[[BaseModel], dict]:
+    """Builds a dump function specialised to model_cls's fields.
+
+    Equivalent to model_dump() for these plain schemas, but reads the instance
+    __dict__ directly and only recurses into fields that hold sub-models.
+    """
+    plan = []
+    for name, field in model_cls.model_fields.items():
+        annotation = _unwrap_optional(field.annotation)
+        if _is_model(annotation):
+            plan.append((name, "model", annotation))
+        elif get_origin(annotation) is list and _is_model(get_args(annotation)[0]):
+            plan.append((name, "model_list", get_args(annotation)[0]))
+        else:
+            plan.append((name, None, None))
+
+    if all(kind is None for _, kind, _ in plan):
+        names = tuple(name for name, _, _ in plan)
+        return lambda instance: {name: instance.__dict__[name] for name in names}
+
+    def dump(instance: BaseModel) -> dict:
+        values = instance.__dict__
+        out = {}
+        for name, kind, sub_cls in plan:
+            value = values[name]
+            if kind is None or value is None:
+                out[name] = value
+            elif kind == "model":
+                out[name] = _DUMPERS[sub_cls](value)
+            else:
+                sub_dump = _DUMPERS[sub_cls]
+                out[name] = [sub_dump(item) for item in value]
+        return out
+
+    return dump
+
+_DUMPERS: Dict[type, Callable[[BaseModel], dict]] = {
+    cls: _make_dumper(cls)
+    for cls in list(globals().values())
+    if _is_model(cls) and cls is not BaseModel
+}
+
+def dump_model(model: BaseModel) -> dict:
+    """Fast model_dump() replacement for the models defined in this module."""
+    return _DUMPERS[type(model)](model)
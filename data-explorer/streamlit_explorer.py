@@ -6,39 +6,113 @@ A Streamlit app for exploring and visualizing Graphiti knowledge graphs
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import networkx as nx
 from neo4j import GraphDatabase
+from neo4j.exceptions import ClientError
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-from typing import Dict, List, Any, Tuple
-from streamlit_agraph import agraph, Node, Edge, Config
-import base64
+from typing import Dict, List, Any, Optional, Tuple
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import re
+import html
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is used without it
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Queries project nodes/relationships as `x {.*, <embedding>: null}` so embedding
+# vectors (hundreds of floats each) are never shipped over bolt just to be hidden.
+
+# Same full-text index Graphiti itself creates over Entity name/summary
+ENTITY_FULLTEXT_INDEX = "node_name_and_summary"
+# Indexes the explorer's queries rely on. Names and definitions match Graphiti's
+# own (graphiti_core.graph_queries), so on a Graphiti-initialised database these
+# are no-ops rather than duplicates.
+EXPLORER_INDEX_QUERIES = [
+    f"""CREATE FULLTEXT INDEX {ENTITY_FULLTEXT_INDEX} IF NOT EXISTS
+    FOR (n:Entity) ON EACH [n.name, n.summary, n.group_id]""",
+    "CREATE INDEX entity_uuid IF NOT EXISTS FOR (n:Entity) ON (n.uuid)",
+    "CREATE INDEX episode_uuid IF NOT EXISTS FOR (n:Episodic) ON (n.uuid)",
+    "CREATE INDEX community_uuid IF NOT EXISTS FOR (n:Community) ON (n.uuid)",
+    "CREATE INDEX created_at_episodic_index IF NOT EXISTS FOR (n:Episodic) ON (n.created_at)",
+]
+_LUCENE_SPECIAL_CHARS = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+def to_fuzzy_lucene_query(search_term: str) -> str:
+    """Escape Lucene syntax in user input and make every term a fuzzy match"""
+    terms = [_LUCENE_SPECIAL_CHARS.sub(r'\\\1', term) for term in search_term.split()]
+    return " ".join(f"{term}~" for term in terms)
+
 def safe_property_value(value: Any) -> str:
     """Safely convert any property value to a displayable string"""
     if value is None:
         return "None"
-    elif isinstance(value, (str, int, float, bool)):
+    # Exact type checks are cheaper than isinstance and cover what Neo4j returns
+    value_type = type(value)
+    if value_type is str:
+        return value
+    if value_type in (int, float, bool):
         return str(value)
-    elif isinstance(value, list):
-        if len(value) == 0:
+    if value_type is list:
+        n = len(value)
+        if n == 0:
             return "[]"
-        elif len(value) <= 3:
-            return f"[{', '.join(str(v) for v in value)}]"
+        elif n <= 3:
+            return f"[{', '.join(map(str, value))}]"
         else:
-            return f"[{', '.join(str(v) for v in value[:3])}, ... (+{len(value)-3} more)]"
-    elif isinstance(value, dict):
+            return f"[{', '.join(map(str, islice(value, 3)))}, ... (+{n - 3} more)]"
+    if value_type is dict:
         return f"{{...}} ({len(value)} keys)"
-    else:
-        return str(value)[:100] + ("..." if len(str(value)) > 100 else "")
+    text = str(value)
+    return text[:100] + ("..." if len(text) > 100 else "")
+
+def format_created_at(value: Any) -> str:
+    """Format epoch timestamps for display; other values are shown as-is"""
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value).strftime('%Y-%m-%d %H:%M:%S')
+        except (OverflowError, OSError, ValueError):
+            return str(value) # fallback if timestamp is unusual
+    return str(value)
+
+def prerender_properties(nodes: List[Dict], skip: List[str]) -> List[Dict[str, str]]:
+    """Render display strings for the properties of many nodes in one pass.
+
+    Builds one DataFrame for the whole page and maps safe_property_value over
+    it column-wise, instead of a dict comprehension per card. Properties a node
+    doesn't have are dropped again per row.
+    """
+    if not nodes:
+        return []
+    # object dtype keeps ints as ints when some nodes lack a property (no NaN upcast)
+    df = pd.DataFrame(nodes, dtype=object)
+    df = df.drop(columns=[col for col in skip if col in df.columns])
+    rendered = df.map(safe_property_value, na_action='ignore')
+    return [{k: v for k, v in row.items() if isinstance(v, str)} for row in rendered.to_dict('records')]
+
+def _html_text(value: str) -> str:
+    """Escape text for raw HTML in st.markdown; newlines become <br> because a blank
+    line would end markdown's HTML block and render the rest of the table as text"""
+    return html.escape(value).replace("\r\n", "\n").replace("\n", "<br>")
+
+def render_property_table(props: Dict[str, str]):
+    """Render pre-rendered properties as one HTML table (one element instead of a widget per cell)"""
+    rows = "".join(
+        f"<tr><th>{_html_text(key.replace('_', ' ').title())}</th><td>{_html_text(value)}</td></tr>"
+        for key, value in props.items()
+    )
+    st.markdown(f"<table class='property-table'>{rows}</table>", unsafe_allow_html=True)
+
+# st.fragment (Streamlit >= 1.37, experimental_fragment before that) reruns only the
+# decorated block on widget interaction; without it, fall back to full-page reruns.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
 
 # Configure Streamlit page
 st.set_page_config(
@@ -71,6 +145,19 @@ st.markdown("""
         border: 1px solid #e1e5e9;
         margin-bottom: 0.5rem;
     }
+    .property-table {
+        width: 100%;
+        margin-bottom: 1rem;
+    }
+    .property-table th {
+        width: 25%;
+        vertical-align: top;
+        white-space: nowrap;
+    }
+    .property-table td {
+        font-family: monospace;
+        word-break: break-word;
+    }
     .relationship-badge {
         background-color: #e1f5fe;
         padding: 0.25rem 0.5rem;
@@ -86,104 +173,190 @@ class GraphitiExplorer:
     def __init__(self):
         self.driver = None
         self.connected = False
+        self.uri = None
+        self.user = None
         
     def connect_to_neo4j(self, uri: str, username: str, password: str) -> bool:
         """Connect to Neo4j database"""
         self.driver = create_connection(uri, username, password)
         self.connected = self.driver is not None
+        self.uri = uri
+        self.user = username
         return self.connected
     
     def close_connection(self):
-        """Close Neo4j connection"""
-        if self.driver:
-            self.driver.close()
+        """Detach from Neo4j; the shared driver stays open for other sessions"""
+        self.driver = None
+        self.connected = False
     
-    def run_query(self, query: str, parameters: dict = None) -> List[Dict]:
-        """Execute a Neo4j query and return results"""
+    def run_cached_query(self, query: str, parameters: dict = None) -> List[Dict]:
+        """Execute a Neo4j query and return results, cached briefly per (connection, query, parameters)"""
         if not self.connected:
             return []
-        
+
+        try:
+            return _cached_query(self.uri, self.user, query, parameters or {}, self.driver)
+        except Exception as e:
+            st.error(f"Query execution failed: {str(e)}")
+            return []
+    
+    def search_entities(self, search_term: str, limit: int = 10) -> List[Dict]:
+        """Search entities via the full-text index, plus an exact UUID match.
+
+        Each result carries its relationship count (rel_count), computed in the
+        same query so listing results needs no per-entity lookups. Falls back
+        to CONTAINS matching if the full-text query fails (e.g. the index could
+        not be created).
+        """
+        if not self.connected:
+            return []
+
+        fulltext_query = """
+        CALL {
+            MATCH (n:Entity {uuid: $search_term})
+            RETURN n, 1.0e9 AS score
+            UNION
+            CALL db.index.fulltext.queryNodes($index_name, $lucene_query, {limit: $limit})
+            YIELD node, score
+            RETURN node AS n, score
+        }
+        WITH n, max(score) AS score
+        ORDER BY score DESC
+        LIMIT $limit
+        RETURN n.uuid as uuid, n.name as name, labels(n) as labels, n.summary as summary,
+               COUNT { (n)--() } AS rel_count
+        ORDER BY score DESC
+        """
+        contains_query = """
+        MATCH (n:Entity)
+        WHERE n.name CONTAINS $search_term 
+           OR n.uuid = $search_term 
+           OR (n.summary IS NOT NULL AND n.summary CONTAINS $search_term)
+        WITH n
+        LIMIT $limit
+        RETURN n.uuid as uuid, n.name as name, labels(n) as labels, n.summary as summary,
+               COUNT { (n)--() } AS rel_count
+        """
+        lucene_query = to_fuzzy_lucene_query(search_term)
         try:
             with self.driver.session() as session:
-                data, error = safe_query(session, query, parameters, "Query")
+                data, error = [], "empty full-text query"
+                if lucene_query:
+                    data, error = safe_query(session, fulltext_query, {
+                        'search_term': search_term, 'index_name': ENTITY_FULLTEXT_INDEX,
+                        'lucene_query': lucene_query, 'limit': limit,
+                    }, "Entity full-text search")
+                if error:
+                    logger.warning(f"Falling back to CONTAINS entity search: {error}")
+                    data, error = safe_query(session, contains_query, {'search_term': search_term, 'limit': limit}, "Entity search")
                 if error:
                     st.error(error)
                 return data
         except Exception as e:
             st.error(f"Query execution failed: {str(e)}")
             return []
-    
+
     def get_database_stats(self) -> Dict[str, Any]:
         """Get overall database statistics"""
-        stats_data = get_database_stats(self.driver) 
+        stats_data = _cached_db_stats(self.uri, self.user, self.driver)
         
         if stats_data.get('error'): 
+            # Don't keep serving a failed result from the cache
+            _cached_db_stats.clear()
             st.error(f"Failed to retrieve database statistics: {stats_data['error']}")
-            return {"labels": [], "relationship_types": [], "total_nodes": 0, "total_relationships": 0, "error": stats_data['error']}
+            return _stats_result(stats_data['error'])
         
         return stats_data
         
-    def get_entity_details(self, entity_id: str) -> List[Dict]:
-        """Get detailed information about an entity"""
-        query = """
-        MATCH (n {uuid: $entity_id})
-        RETURN n
-        """
-        return self.run_query(query, {'entity_id': entity_id})
-
     def get_recent_episodes(self, limit: int = 10) -> List[Dict]:
         """Get recent episodic nodes from the graph, ordered by creation time."""
         query = """
         MATCH (e:Episodic)
-        RETURN e
+        RETURN e {.*, name_embedding: null, entity_edges_embedding: null} AS e
         ORDER BY e.created_at DESC
         LIMIT $limit
         """
-        return self.run_query(query, {'limit': limit})
+        return self.run_cached_query(query, {'limit': limit})
 
-    def get_entity_relationships_for_table(self, entity_uuid: str) -> List[Dict]:
-        """Fetch all relationships for a given entity, formatted for a table."""
+    def get_entity_with_relationships(self, entity_uuid: str) -> Tuple[Optional[Dict], pd.DataFrame]:
+        """Fetch an entity and its relationship table rows in a single round-trip."""
         query = """
-        MATCH (source {uuid: $entity_uuid})-[r]-(target)
-        RETURN
-            source.name AS source_name,
-            type(r) AS relationship_type,
-            properties(r) as relationship_properties,
-            target.name AS target_name,
-            labels(target) as target_labels
+        MATCH (n:Entity {uuid: $entity_uuid})
+        OPTIONAL MATCH (n)-[r]-(target)
+        WITH n, collect(CASE WHEN r IS NULL THEN NULL ELSE {
+            source_name: n.name,
+            relationship_type: type(r),
+            relationship_properties: r {.*, fact_embedding: null},
+            target_name: target.name,
+            target_labels: labels(target)
+        } END) AS rels
+        RETURN n {.*, name_embedding: null} AS n, rels
         """
-        results = self.run_query(query, {'entity_uuid': entity_uuid})
-        
-        table_data = []
-        for record in results:
-            rel_props = record.get('relationship_properties', {})
-            table_data.append({
-                "Source": record.get('source_name'),
-                "Relationship": record.get('relationship_type'),
-                "Target": record.get('target_name'),
-                "Target Labels": record.get('target_labels', []),
-                "Relationship Properties": json.dumps({k: safe_property_value(v) for k, v in rel_props.items()}, indent=2) if rel_props else "{}"
-            })
-        return table_data
+        if not self.connected:
+            return None, format_relationship_rows([])
+        try:
+            return _cached_entity_with_relationships(self.uri, self.user, query, {'entity_uuid': entity_uuid}, self.driver)
+        except Exception as e:
+            st.error(f"Query execution failed: {str(e)}")
+            return None, format_relationship_rows([])
 
     def get_communities(self, limit: int = 20) -> List[Dict]:
         """Get community nodes from the graph"""
         query = """
         MATCH (c:Community)
-        RETURN c
+        RETURN c {.*, name_embedding: null} AS c
         ORDER BY c.name ASC
         LIMIT $limit
         """
-        return self.run_query(query, {'limit': limit})
+        return self.run_cached_query(query, {'limit': limit})
+
+RELATIONSHIP_TABLE_COLUMNS = {
+    "source_name": "Source",
+    "relationship_type": "Relationship",
+    "target_name": "Target",
+    "target_labels": "Target Labels",
+    "relationship_properties": "Relationship Properties",
+}
+
+def _format_relationship_properties(rel_props: Dict) -> str:
+    if not rel_props:
+        return "{}"
+    # Neo4j never stores nulls, so None only marks an embedding the query blanked out
+    props = {k: safe_property_value(v) for k, v in rel_props.items() if v is not None}
+    if orjson is not None:
+        return orjson.dumps(props, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(props, indent=2)
+
+def format_relationship_rows(records: List[Dict]) -> pd.DataFrame:
+    """Shape relationship query records into the relationships table, column-wise"""
+    df = pd.DataFrame(records, columns=list(RELATIONSHIP_TABLE_COLUMNS))
+    df['target_labels'] = df['target_labels'].map(lambda labels: labels or [])
+    df['relationship_properties'] = df['relationship_properties'].map(_format_relationship_properties)
+    return df.rename(columns=RELATIONSHIP_TABLE_COLUMNS)
+
+@st.cache_resource(show_spinner=False)
+def _get_driver(uri, user, password):
+    """One driver (and bolt connection pool) per credentials, shared by all sessions.
+
+    Connectivity is verified here: a failing driver is closed and the exception
+    raised, and st.cache_resource never caches exceptions. The explorer's indexes
+    are ensured here too, so they run once per driver rather than on every Connect.
+    """
+    driver = GraphDatabase.driver(uri, auth=(user, password), max_connection_pool_size=50, connection_acquisition_timeout=30)
+    try:
+        driver.verify_connectivity()
+    except Exception:
+        driver.close()
+        raise
+    ensure_explorer_indexes(driver)
+    return driver
 
 def create_connection(uri, user, password):
     """Create Neo4j connection with proper error handling"""
     try:
-        driver = GraphDatabase.driver(uri, auth=(user, password))
-        # Test the connection
-        with driver.session() as session:
-            result = session.run("RETURN 1 as test")
-            result.single()
+        # Connectivity is verified once, when the shared driver is created; after
+        # that an unreachable database surfaces as a query error
+        driver = _get_driver(uri, user, password)
         st.success("✅ Successfully connected to Neo4j!")
         logger.info(f"Connected to Neo4j at {uri}")
         return driver
@@ -192,6 +365,16 @@ def create_connection(uri, user, password):
         logger.error(f"Neo4j connection failed: {str(e)}")
         return None
 
+def ensure_explorer_indexes(driver):
+    """Create the indexes used for entity search and uuid lookups if they are missing"""
+    with driver.session() as session:
+        for index_query in EXPLORER_INDEX_QUERIES:
+            try:
+                session.run(index_query).consume()
+            except Exception as e:
+                # Queries still work without the index, just via scans (or CONTAINS for search)
+                logger.warning(f"Could not ensure index ({index_query.split(' IF ')[0]}): {str(e)}")
+
 def safe_query(session, query, parameters=None, description="Query"):
     """Execute query with comprehensive error handling"""
     try:
@@ -199,8 +382,8 @@ def safe_query(session, query, parameters=None, description="Query"):
         if parameters:
             logger.info(f"Parameters: {parameters}")
         
-        result = session.run(query, parameters or {})
-        data = [record.data() for record in result]
+        # Managed read transaction: retried on transient errors, records converted in bulk
+        data = session.execute_read(lambda tx: tx.run(query, parameters or {}).data())
         logger.info(f"{description} returned {len(data)} records")
         return data, None
     except Exception as e:
@@ -208,74 +391,156 @@ def safe_query(session, query, parameters=None, description="Query"):
         logger.error(error_msg)
         return [], error_msg
 
+def _stats_result(error: str = None, **overrides) -> Dict[str, Any]:
+    stats = {"labels": [], "relationship_types": [], "label_counts": {}, "relationship_type_counts": {},
+             "total_nodes": 0, "total_relationships": 0, "error": error}
+    stats.update(overrides)
+    return stats
+
+def get_meta_stats(session):
+    """Read labels, relationship types and their counts from APOC's counter store.
+
+    Returns None when APOC is not installed so the caller can fall back to the
+    plain db.labels()/count() queries.
+    """
+    query = """
+    CALL apoc.meta.stats() YIELD labels, relTypesCount, nodeCount, relCount
+    RETURN labels, relTypesCount, nodeCount, relCount
+    """
+    try:
+        logger.info(f"Executing Meta stats query: {query}")
+        record = session.run(query).single()
+    except ClientError as e:
+        if e.code == "Neo.ClientError.Procedure.ProcedureNotFound":
+            logger.info("apoc.meta.stats() not available, falling back to per-query stats")
+            return None
+        raise
+    label_counts = dict(record["labels"] or {})
+    rel_type_counts = dict(record["relTypesCount"] or {})
+    return _stats_result(
+        labels=list(label_counts),
+        relationship_types=list(rel_type_counts),
+        label_counts=label_counts,
+        relationship_type_counts=rel_type_counts,
+        total_nodes=record["nodeCount"] or 0,
+        total_relationships=record["relCount"] or 0,
+    )
+
+FALLBACK_STATS_QUERIES = {
+    "labels": ("CALL db.labels()", "Labels query"),
+    "relationship_types": ("CALL db.relationshipTypes()", "Relationship types query"),
+    "node_count": ("MATCH (n) RETURN count(n) as count", "Node count query"),
+    "relationship_count": ("MATCH ()-[r]->() RETURN count(r) as count", "Relationship count query"),
+}
+
+def _run_stat_query(driver, query, description):
+    # Sessions are not thread-safe, so every worker opens its own
+    with driver.session() as session:
+        return safe_query(session, query, description=description)
+
 def get_database_stats(driver):
     """Get database statistics with error handling"""
     if not driver:
-        return {"error": "No database driver available.", "labels": [], "relationship_types": [], "total_nodes": 0, "total_relationships": 0}
+        return _stats_result("No database driver available.")
         
     try:
         with driver.session() as session:
-            labels_data, labels_error = safe_query(session, "CALL db.labels()", description="Labels query")
-            if labels_error:
-                logger.warning(f"Could not fetch labels: {labels_error}")
-                return {"error": f"Labels query failed: {labels_error}", "labels": [], "relationship_types": [], "total_nodes": 0, "total_relationships": 0}
-
-            labels = [record['label'] for record in labels_data] if labels_data else []
-            
-            rel_types_data, rel_error = safe_query(session, "CALL db.relationshipTypes()", description="Relationship types query")
-            if rel_error:
-                logger.warning(f"Could not fetch relationship types: {rel_error}")
-                return {"error": f"Relationship types query failed: {rel_error}", "labels": labels, "relationship_types": [], "total_nodes": 0, "total_relationships": 0}
+            meta_stats = get_meta_stats(session)
+            if meta_stats is not None:
+                return meta_stats
+
+        # The fallback queries are independent, so overlap their round-trips
+        with ThreadPoolExecutor(max_workers=len(FALLBACK_STATS_QUERIES)) as executor:
+            futures = {name: executor.submit(_run_stat_query, driver, query, description)
+                       for name, (query, description) in FALLBACK_STATS_QUERIES.items()}
+            results = {name: future.result() for name, future in futures.items()}
+
+        labels_data, labels_error = results["labels"]
+        if labels_error:
+            logger.warning(f"Could not fetch labels: {labels_error}")
+            return _stats_result(f"Labels query failed: {labels_error}")
+
+        labels = [record['label'] for record in labels_data] if labels_data else []
+        
+        rel_types_data, rel_error = results["relationship_types"]
+        if rel_error:
+            logger.warning(f"Could not fetch relationship types: {rel_error}")
+            return _stats_result(f"Relationship types query failed: {rel_error}", labels=labels)
 
-            rel_types = [record['relationshipType'] for record in rel_types_data] if rel_types_data else []
-            
-            node_count_data, node_error = safe_query(session, "MATCH (n) RETURN count(n) as count", description="Node count query")
-            total_nodes = node_count_data[0]['count'] if node_count_data and not node_error else 0
-            if node_error: logger.warning(f"Node count query failed: {node_error}")
+        rel_types = [record['relationshipType'] for record in rel_types_data] if rel_types_data else []
+        
+        node_count_data, node_error = results["node_count"]
+        total_nodes = node_count_data[0]['count'] if node_count_data and not node_error else 0
+        if node_error: logger.warning(f"Node count query failed: {node_error}")
 
-            rel_count_data, rel_count_error = safe_query(session, "MATCH ()-[r]->() RETURN count(r) as count", description="Relationship count query")
-            total_relationships = rel_count_data[0]['count'] if rel_count_data and not rel_count_error else 0
-            if rel_count_error: logger.warning(f"Relationship count query failed: {rel_count_error}")
-            
-            errors_list = [e for e in [labels_error, rel_error, node_error, rel_count_error] if e]
-
-            return {
-                "labels": labels,
-                "relationship_types": rel_types,
-                "total_nodes": total_nodes,
-                "total_relationships": total_relationships,
-                "error": "; ".join(errors_list) if errors_list else None
-            }
+        rel_count_data, rel_count_error = results["relationship_count"]
+        total_relationships = rel_count_data[0]['count'] if rel_count_data and not rel_count_error else 0
+        if rel_count_error: logger.warning(f"Relationship count query failed: {rel_count_error}")
+        
+        errors_list = [e for e in [labels_error, rel_error, node_error, rel_count_error] if e]
+
+        return _stats_result(
+            "; ".join(errors_list) if errors_list else None,
+            labels=labels,
+            relationship_types=rel_types,
+            total_nodes=total_nodes,
+            total_relationships=total_relationships,
+        )
             
     except Exception as e:
         error_msg = f"Database stats query failed: {str(e)}"
         logger.error(error_msg)
-        return {"error": error_msg, "labels": [], "relationship_types": [], "total_nodes": 0, "total_relationships": 0}
-
-def render_entity_exploration_page(explorer: GraphitiExplorer):
-    st.header("🏷️ Explore Entities")
-    st.write("Deep dive into semantic entities, their properties, and connections. Search for an entity to see its details and local graph neighborhood.")
-
+        return _stats_result(error_msg)
+
+def _read_or_raise(driver, query: str, parameters: dict) -> List[Dict]:
+    """Run a read query for a cached function; errors raise so they are never cached"""
+    with driver.session() as session:
+        data, error = safe_query(session, query, parameters, "Cached query")
+    if error:
+        raise RuntimeError(error)
+    return data
+
+@st.cache_data(ttl=30, max_entries=256, show_spinner=False)
+def _cached_query(uri: str, user: str, query: str, parameters: dict, _driver) -> List[Dict]:
+    """Read query results cached per connection"""
+    return _read_or_raise(_driver, query, parameters)
+
+# The entity's relationship table is cached as a finished DataFrame, so reruns skip
+# both the query and the per-row formatting
+@st.cache_data(ttl=60, max_entries=256, show_spinner=False)
+def _cached_entity_with_relationships(uri: str, user: str, query: str, parameters: dict, _driver) -> Tuple[Optional[Dict], pd.DataFrame]:
+    results = _read_or_raise(_driver, query, parameters)
+    if not results or not results[0].get('n'):
+        return None, format_relationship_rows([])
+    return results[0]['n'], format_relationship_rows(results[0].get('rels') or [])
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_db_stats(uri: str, user: str, _driver) -> Dict[str, Any]:
+    """Database statistics cached per connection; the driver itself is not hashed"""
+    return get_database_stats(_driver)
+
+@_fragment
+def _entity_search_fragment(explorer: GraphitiExplorer):
+    """Search input and results; typing only reruns this fragment"""
     search_term_entities = st.text_input("Search for an Entity (by name, UUID, or summary keyword):", key="entity_search_term_input")
-    
-    selected_entity_uuid = st.session_state.get('selected_entity_uuid_for_exploration', None)
 
     if search_term_entities:
-        with st.spinner(f"Searching for entities matching '{search_term_entities}'..."):
-            query = """
-            MATCH (n:Entity)
-            WHERE n.name CONTAINS $search_term 
-               OR n.uuid = $search_term 
-               OR (n.summary IS NOT NULL AND n.summary CONTAINS $search_term)
-            RETURN n.uuid as uuid, n.name as name, labels(n) as labels, n.summary as summary
-            LIMIT 10
-            """
-            results = explorer.run_query(query, {'search_term': search_term_entities})
+        # Selecting a result forces a full rerun; that one rerun reuses the search it
+        # was picked from, any later one queries again so names and counts stay fresh
+        cached_search = st.session_state.pop('entity_search_results', None)
+        if cached_search and cached_search['term'] == search_term_entities:
+            results = cached_search['results']
+        else:
+            with st.spinner(f"Searching for entities matching '{search_term_entities}'..."):
+                results = explorer.search_entities(search_term_entities)
 
         if results:
             st.subheader("Search Results:")
-            entity_options = {f"{res.get('name', 'Unnamed Entity')} ({res['uuid']})": res['uuid'] for res in results if res.get('uuid')}
-            
+            entity_options = {
+                f"{res.get('name', 'Unnamed Entity')} ({res['uuid']}) · {res.get('rel_count', 0)} relationships": res['uuid']
+                for res in results if res.get('uuid')
+            }
+        
             if not entity_options:
                 st.write("No entities found with a displayable name and UUID.")
             else:
@@ -283,64 +548,54 @@ def render_entity_exploration_page(explorer: GraphitiExplorer):
                 for display_name, uuid_val in entity_options.items():
                     if st.button(display_name, key=f"select_entity_{uuid_val}"):
                         st.session_state.selected_entity_uuid_for_exploration = uuid_val
-                        selected_entity_uuid = uuid_val # Update for current run
-                        st.rerun() # Rerun to process selection
+                        st.session_state.entity_search_results = {'term': search_term_entities, 'results': results}
+                        st.rerun() # Full rerun so the details section picks up the selection
         else:
             st.write("No entities found matching your search term.")
-    
-    if selected_entity_uuid:
-        st.markdown("---")
-        # Fetch fresh details in case button state is tricky
-        entity_details_data = explorer.get_entity_details(selected_entity_uuid)
-        
-        if entity_details_data and entity_details_data[0].get('n'):
-            selected_entity_details = entity_details_data[0]['n']
-            st.subheader(f"Exploring Entity: {selected_entity_details.get('name', selected_entity_uuid)}")
-            
-            st.markdown("**Entity Properties:**")
-            props_to_display = {k: safe_property_value(v) for k, v in selected_entity_details.items() if k not in ['name_embedding']}
-            num_props = len(props_to_display)
-            cols_per_row = 3
-            prop_items = list(props_to_display.items())
-            
-            for i in range(0, num_props, cols_per_row):
-                cols = st.columns(cols_per_row)
-                for j in range(cols_per_row):
-                    if i + j < num_props:
-                        key, value = prop_items[i+j]
-                        with cols[j]:
-                            st.markdown(f"**{key.replace('_', ' ').title()}:**")
-                            # Use st.caption or st.code for value to handle long strings better
-                            if len(value) > 70:
-                                st.caption(value)
-                            else:
-                                st.markdown(f"`{value}`")
-            
-            if 'summary' in selected_entity_details and selected_entity_details['summary']:
-                 with st.expander("Full Summary", expanded=False):
-                        st.markdown(selected_entity_details['summary'])
-            
-            st.markdown("**Entity Relationships Table:**")
-            with st.spinner("Loading entity relationships..."):
-                relationships = explorer.get_entity_relationships_for_table(selected_entity_uuid)
-
-            if relationships:
-                df = pd.DataFrame(relationships)
-                # Reorder columns for better readability
-                display_cols = ["Source", "Relationship", "Target", "Target Labels", "Relationship Properties"]
-                # Ensure all columns exist before trying to display them
-                existing_cols = [col for col in display_cols if col in df.columns]
-                st.dataframe(df[existing_cols], use_container_width=True)
-            else:
-                st.info("This entity has no direct relationships.")
+
+@_fragment
+def _entity_detail_fragment(explorer: GraphitiExplorer, selected_entity_uuid: str):
+    """Properties and relationships of the selected entity"""
+    st.markdown("---")
+    # One round-trip for the entity and its relationships
+    with st.spinner("Loading entity details and relationships..."):
+        selected_entity_details, relationships = explorer.get_entity_with_relationships(selected_entity_uuid)
+
+    if selected_entity_details:
+        st.subheader(f"Exploring Entity: {selected_entity_details.get('name', selected_entity_uuid)}")
+
+        st.markdown("**Entity Properties:**")
+        props_to_display = {k: safe_property_value(v) for k, v in selected_entity_details.items() if k not in ['name_embedding']}
+        render_property_table(props_to_display)
+
+        if 'summary' in selected_entity_details and selected_entity_details['summary']:
+             with st.expander("Full Summary", expanded=False):
+                    st.markdown(selected_entity_details['summary'])
+
+        st.markdown("**Entity Relationships Table:**")
+        if not relationships.empty:
+            st.dataframe(relationships, use_container_width=True)
         else:
-            st.error(f"Could not retrieve details for entity UUID: {selected_entity_uuid}")
-            st.session_state.selected_entity_uuid_for_exploration = None # Clear selection on error
+            st.info("This entity has no direct relationships.")
+    else:
+        st.error(f"Could not retrieve details for entity UUID: {selected_entity_uuid}")
+        st.session_state.selected_entity_uuid_for_exploration = None # Clear selection on error
 
-def render_episodic_data_page(explorer: GraphitiExplorer):
-    st.header("📝 Explore Episodic Data")
-    st.write("Browse through raw episodic data, such as conversation chunks or ingested documents. The most recent episodes are listed first.")
+def render_entity_exploration_page(explorer: GraphitiExplorer):
+    st.header("🏷️ Explore Entities")
+    st.write("Deep dive into semantic entities, their properties, and connections. Search for an entity to see its details and local graph neighborhood.")
+
+    _entity_search_fragment(explorer)
+
+    selected_entity_uuid = st.session_state.get('selected_entity_uuid_for_exploration', None)
+    if selected_entity_uuid:
+        _entity_detail_fragment(explorer, selected_entity_uuid)
+
+EPISODE_CONTENT_PREVIEW_CHARS = 2000
 
+@_fragment
+def _episode_list_fragment(explorer: GraphitiExplorer):
+    """Episode slider and list; dragging the slider only reruns this fragment"""
     limit = st.slider("Number of recent episodes to display:", 5, 50, 10)
 
     with st.spinner("Loading recent episodes..."):
@@ -351,58 +606,76 @@ def render_episodic_data_page(explorer: GraphitiExplorer):
         return
 
     st.subheader(f"Displaying {len(episodes)} Most Recent Episodes")
-    for episode_data in episodes:
-        episode = episode_data.get('e') # The query returns records with key 'e'
-        if not episode:
-            st.warning("Found an episode entry with missing data.")
-            continue
-
-        episode_name = episode.get('name', episode.get('uuid', 'Unnamed Episode'))
-        episode_source = episode.get('source', 'Unknown source')
-        episode_created_at = episode.get('created_at', 'N/A')
-        if isinstance(episode_created_at, (int, float)):
-             try:
-                episode_created_at = datetime.fromtimestamp(episode_created_at).strftime('%Y-%m-%d %H:%M:%S')
-             except:
-                episode_created_at = str(episode_created_at) # fallback if timestamp is unusual
-        
-        # Display summary in an expander
-        with st.expander(f"**{episode_name}** (Source: {episode_source} | Created: {episode_created_at})"):
-            st.markdown("**Full Episode Details:**")
-            
-            # Display all properties except potentially very long ones like embeddings or full content here
-            props_to_display = {k: safe_property_value(v) for k, v in episode.items() 
-                                if k not in ['content', 'name_embedding', 'entity_edges_embedding']}
-            num_props = len(props_to_display)
-            cols_per_row = 2
-            prop_items = list(props_to_display.items())
-            
-            for i in range(0, num_props, cols_per_row):
-                cols = st.columns(cols_per_row)
-                for j in range(cols_per_row):
-                    if i + j < num_props:
-                        key, value = prop_items[i+j]
-                        with cols[j]:
-                            st.markdown(f"**{key.replace('_', ' ').title()}:**")
-                            if len(value) > 100:
-                                st.caption(value)
-                            else:
-                                st.markdown(f"`{value}`")
-            
-            if 'content' in episode and episode['content']:
-                st.markdown("**Content:**")
-                st.markdown(f"```text\n{episode['content']}\n```")
-            
-            if 'entity_edges' in episode and episode['entity_edges']:
-                st.markdown("**Mentioned Entity Edges (UUIDs):**")
-                if isinstance(episode['entity_edges'], list) and episode['entity_edges']:
-                    for edge_uuid in episode['entity_edges']:
-                        st.markdown(f"- `{edge_uuid}`")
-                    # TODO: Optionally, make these clickable to navigate to entity explorer or fetch edge details
-                elif episode['entity_edges']:
-                    st.caption(safe_property_value(episode['entity_edges']))
+    episode_nodes = [episode_data.get('e') for episode_data in episodes if episode_data.get('e')] # The query returns records with key 'e'
+    if len(episode_nodes) < len(episodes):
+        st.warning(f"Skipped {len(episodes) - len(episode_nodes)} episode entries with missing data.")
+
+    # One table for the index instead of an expander per episode; details render for the selected row only
+    summary_df = pd.DataFrame([{
+        "Name": episode.get('name', episode.get('uuid', 'Unnamed Episode')),
+        "Source": episode.get('source', 'Unknown source'),
+        "Created": format_created_at(episode.get('created_at', 'N/A')),
+        "Preview": (episode.get('content') or "")[:120],
+    } for episode in episode_nodes])
+    selection = st.dataframe(
+        summary_df,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="episode_table",
+    )
+
+    selected_rows = selection.selection.rows
+    # The stored selection can outlive a smaller episode limit
+    if not selected_rows or selected_rows[0] >= len(episode_nodes):
+        st.caption("Select an episode in the table to see its full details.")
+        return
+
+    episode = episode_nodes[selected_rows[0]]
+    # Display all properties except potentially very long ones like embeddings or full content
+    # One node: a dict comprehension beats building a DataFrame for a single row
+    skip = ('content', 'name_embedding', 'entity_edges_embedding')
+    props_to_display = {k: safe_property_value(v) for k, v in episode.items() if k not in skip}
+    episode_name = summary_df.at[selected_rows[0], "Name"]
+    episode_source = summary_df.at[selected_rows[0], "Source"]
+    episode_created_at = summary_df.at[selected_rows[0], "Created"]
+
+    with st.expander(f"**{episode_name}** (Source: {episode_source} | Created: {episode_created_at})", expanded=True):
+        st.markdown("**Full Episode Details:**")
+        render_property_table(props_to_display)
+
+        if 'content' in episode and episode['content']:
+            st.markdown("**Content:**")
+            content = str(episode['content'])
+            # Ingested documents can be hundreds of KB; only send a preview unless asked
+            if len(content) > EPISODE_CONTENT_PREVIEW_CHARS:
+                show_full = st.toggle(f"Show full content ({len(content):,} characters)",
+                                      key=f"full_content_{episode.get('uuid')}")
+                if show_full:
+                    st.code(content, language="text")
                 else:
-                    st.caption("No entity edges listed.")
+                    st.markdown(f"```text\n{content[:EPISODE_CONTENT_PREVIEW_CHARS]}\n```")
+                    st.caption(f"Showing the first {EPISODE_CONTENT_PREVIEW_CHARS:,} characters.")
+            else:
+                st.markdown(f"```text\n{content}\n```")
+        
+        if 'entity_edges' in episode and episode['entity_edges']:
+            st.markdown("**Mentioned Entity Edges (UUIDs):**")
+            if isinstance(episode['entity_edges'], list) and episode['entity_edges']:
+                for edge_uuid in episode['entity_edges']:
+                    st.markdown(f"- `{edge_uuid}`")
+                # TODO: Optionally, make these clickable to navigate to entity explorer or fetch edge details
+            elif episode['entity_edges']:
+                st.caption(safe_property_value(episode['entity_edges']))
+            else:
+                st.caption("No entity edges listed.")
+
+def render_episodic_data_page(explorer: GraphitiExplorer):
+    st.header("📝 Explore Episodic Data")
+    st.write("Browse through raw episodic data, such as conversation chunks or ingested documents. The most recent episodes are listed first.")
+
+    _episode_list_fragment(explorer)
 
 def render_communities_page(explorer: GraphitiExplorer):
     st.header("👥 Explore Communities")
@@ -426,20 +699,17 @@ def render_communities_page(explorer: GraphitiExplorer):
         return
 
     st.subheader(f"Found {len(communities_data)} Communities")
-    for community_item in communities_data:
-        community = community_item.get('c') # Assuming query returns 'c'
-        if not community:
-            st.warning("Found a community entry with missing data.")
-            continue
+    community_nodes = [community_item.get('c') for community_item in communities_data if community_item.get('c')] # Assuming query returns 'c'
+    if len(community_nodes) < len(communities_data):
+        st.warning(f"Skipped {len(communities_data) - len(community_nodes)} community entries with missing data.")
+    rendered_props = prerender_properties(community_nodes, ['name_embedding'])
+    for community, props_to_display in zip(community_nodes, rendered_props, strict=True):
 
         community_name = community.get('name', community.get('uuid', 'Unnamed Community'))
         
         with st.expander(f"**Community: {community_name}**"):
             st.markdown("**Community Properties:**")
-            props_to_display = {k: safe_property_value(v) for k, v in community.items() if k != 'name_embedding'}
-            # Simple list display for now
-            for key, value in props_to_display.items():
-                st.markdown(f"- **{key.replace('_', ' ').title()}:** `{value}`")
+            render_property_table(props_to_display)
             
             # Placeholder for community members or further details
             st.markdown("**Further Exploration (Placeholder):**")
@@ -463,6 +733,10 @@ def main():
     neo4j_password = st.sidebar.text_input("Password", value=default_password, type="password")
     
     if st.sidebar.button("Connect"):
+        _cached_query.clear()
+        _cached_entity_with_relationships.clear()
+        _cached_db_stats.clear()
+        st.session_state.pop('entity_search_results', None)
         if explorer.connect_to_neo4j(neo4j_uri, neo4j_user, neo4j_password):
             st.sidebar.success("✅ Connected to Neo4j!")
             st.rerun() # Force rerun to update page content after connection
@@ -481,6 +755,9 @@ def main():
         """)
         return
 
+    if st.sidebar.button("🔄 Refresh stats"):
+        _cached_db_stats.clear()
+
     # Sidebar Navigation
     st.sidebar.title("📄 Navigation")
     page_options = ["📊 Overview", "🏷️ Explore Entities", "📝 Explore Episodic Data", "👥 Explore Communities"]
@@ -511,6 +788,9 @@ def main():
 
 def show_overview(explorer: GraphitiExplorer):
     """Display database overview and statistics"""
+    # Imported here so pages without charts don't pay plotly's import cost
+    import plotly.graph_objects as go
+
     st.header("📊 Database Overview")
     
     with st.spinner("Loading database statistics..."):
@@ -538,18 +818,26 @@ def show_overview(explorer: GraphitiExplorer):
     # Node distribution chart
     if stats.get('labels'):
         st.subheader("📈 Node Distribution by Type")
-        node_df = pd.DataFrame(stats['labels'], columns=['Type'])
-        node_df['Count'] = 1
-        fig_nodes = px.pie(node_df, values='Count', names='Type', title="Distribution of Node Types")
-        st.plotly_chart(fig_nodes, use_container_width=True)
+        label_counts = stats.get('label_counts')
+        if label_counts:
+            fig_nodes = go.Figure(go.Pie(labels=list(label_counts), values=list(label_counts.values())))
+            fig_nodes.update_layout(title="Distribution of Node Types")
+            st.plotly_chart(fig_nodes, use_container_width=True)
+        else:
+            st.caption("Per-type counts need APOC (apoc.meta.stats); showing node types only.")
+            st.write(", ".join(stats['labels']))
     
     # Relationship distribution chart
     if stats.get('relationship_types'):
         st.subheader("🔗 Relationship Distribution by Type")
-        rel_df = pd.DataFrame(stats['relationship_types'], columns=['Type'])
-        rel_df['Count'] = 1
-        fig_rels = px.bar(rel_df, x='Type', y='Count', title="Count of Relationships by Type")
-        st.plotly_chart(fig_rels, use_container_width=True)
+        rel_counts = stats.get('relationship_type_counts')
+        if rel_counts:
+            fig_rels = go.Figure(go.Bar(x=list(rel_counts), y=list(rel_counts.values())))
+            fig_rels.update_layout(title="Count of Relationships by Type", xaxis_title="Type", yaxis_title="Count")
+            st.plotly_chart(fig_rels, use_container_width=True)
+        else:
+            st.caption("Per-type counts need APOC (apoc.meta.stats); showing relationship types only.")
+            st.write(", ".join(stats['relationship_types']))
 
 if __name__ == "__main__":
     main()
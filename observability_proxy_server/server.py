@@ -4,25 +4,41 @@ Handles /models and /chat/completions endpoints with SSE streaming support.
 """
 
 import os
-import json
 import asyncio
 import secrets
+import logging
 from typing import Dict, Any, Optional, AsyncGenerator, List, Callable
 from contextlib import asynccontextmanager
+from functools import lru_cache
 
 from fastapi import FastAPI, Request, Response, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security.api_key import APIKeyHeader
 import httpx
+import orjson
 from pydantic import BaseModel
 from langfuse import Langfuse
 from langfuse.decorators import observe
 import uvicorn
 from dotenv import load_dotenv
 
+from sse import SSEContentCollector
+
 load_dotenv(override=True)
 
+# Per-request payload logging is opt-in: serializing and writing every payload
+# to stdout blocks the event loop on the hot path
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+# Only this module's logger is configured; the root logger is left alone so
+# httpx/httpcore/h2 don't log every upstream request (or their internals on DEBUG)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+logger.addHandler(_log_handler)
+logger.propagate = False
+
 # Initialize Langfuse client
 langfuse = Langfuse(
     secret_key=os.getenv("LANGFUSE_SECRET_KEY"),
@@ -53,11 +69,13 @@ if not API_KEY:
     print("WARNING: API_KEY environment variable is not set. Generating a random key for this session.")
     API_KEY = secrets.token_urlsafe(32)
     print(f"Generated API_KEY: {API_KEY}")
+# Encoded once for the constant-time comparison in get_api_key
+API_KEY_BYTES = API_KEY.encode()
 
 api_key_header = APIKeyHeader(name="x-api-key", auto_error=False)
 
 async def get_api_key(api_key: str = Depends(api_key_header)):
-    if not api_key or api_key != API_KEY:
+    if not api_key or not secrets.compare_digest(api_key.encode(), API_KEY_BYTES):
         raise HTTPException(
             status_code=401,
             detail="Invalid or missing API key",
@@ -65,12 +83,69 @@ async def get_api_key(api_key: str = Depends(api_key_header)):
         )
     return api_key
 
+OPENROUTER_CHAT_COMPLETIONS_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+# Static upstream headers, built once; requests with a session add X-Session-Id to a copy
+OPENROUTER_HEADERS = {
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "Content-Type": "application/json",
+    "HTTP-Referer": os.getenv("HTTP_REFERER", "http://localhost:8000"),
+    "X-Title": os.getenv("X_TITLE", "Graphiti Proxy Server")
+}
+
+async def _langfuse_worker(queue: asyncio.Queue) -> None:
+    """
+    Apply queued Langfuse events in order, off the request path.
+    Events are ("start" | "update" | "close", generation_key, kwargs); None stops the worker.
+    """
+    generations = {}
+    while True:
+        event = await queue.get()
+        try:
+            if event is None:
+                return
+            op, key, kwargs = event
+            if op == "start":
+                trace = langfuse.trace(**kwargs["trace"])
+                generations[key] = trace.generation(**kwargs["generation"])
+            elif op == "update":
+                if key in generations:
+                    generations[key].update(**kwargs)
+            elif op == "close":
+                generations.pop(key, None)
+        except Exception as e:
+            logger.warning("Failed to record Langfuse event: %s", e)
+        finally:
+            queue.task_done()
+
+def record_langfuse(op: str, key: object, **kwargs) -> None:
+    """Queue a Langfuse event for the background worker."""
+    app.state.langfuse_queue.put_nowait((op, key, kwargs))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events."""
+    if not OPENROUTER_API_KEY:
+        raise RuntimeError("Server configuration error: Missing OPENROUTER_API_KEY")
+    # One pooled client for all upstream calls, so warm connections to
+    # OpenRouter are reused instead of doing a TCP+TLS handshake per request.
+    # Every connection goes to the same host, so keep as many alive as the pool
+    # allows: a smaller keepalive pool closes and reopens connections on every
+    # burst, which is where the tail latency under concurrency comes from.
+    app.state.http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(60.0, connect=10.0),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=100, keepalive_expiry=75.0),
+        http2=True,
+    )
+    app.state.langfuse_queue = asyncio.Queue()
+    langfuse_worker = asyncio.create_task(_langfuse_worker(app.state.langfuse_queue))
     yield
-    # On shutdown, flush any buffered events
+    await app.state.http_client.aclose()
+    # On shutdown, drain queued events, then flush the SDK's buffer
     print("Shutting down and flushing Langfuse events...")
+    app.state.langfuse_queue.put_nowait(None)
+    await app.state.langfuse_queue.join()
+    await langfuse_worker
     langfuse.flush()
     print("Langfuse events flushed.")
 
@@ -96,9 +171,32 @@ app.add_middleware(
 @app.get("/models")
 async def get_models():
     """Handle requests to /models endpoint."""
-    print("Handling /models request")
+    logger.debug("Handling /models request")
     return {"message": "Success: /models path hit"}
 
+def _normalize_claude(model_id: str) -> str:
+    """Anthropic models: add the provider and drop the date suffix."""
+    parts = model_id.split('-')
+    if len(parts) > 3:
+        # e.g., claude-3-haiku-20240307 -> claude-3-haiku
+        return f"anthropic/{'-'.join(parts[:3])}"
+    return f"anthropic/{model_id}"
+
+
+def _normalize_gpt(model_id: str) -> str:
+    """OpenAI models: add the provider."""
+    return f"openai/{model_id}"
+
+
+# (marker, normalizer) pairs, checked in order; the first marker found in the
+# model id wins. Substring matching keeps ids like 'chatgpt-4o-latest' covered.
+_MODEL_RULES = (
+    ("claude", _normalize_claude),
+    ("gpt", _normalize_gpt),
+)
+
+
+@lru_cache(maxsize=256)
 def normalize_model_name(model_id: str) -> str:
     """
     Normalizes the model name to the OpenRouter standard.
@@ -109,29 +207,95 @@ def normalize_model_name(model_id: str) -> str:
         # Already has a provider, assume it's correct
         return model_id
 
-    # Handle Anthropic models
-    if "claude" in model_id:
-        parts = model_id.split('-')
-        if len(parts) > 3:
-            # e.g., claude-3-haiku-20240307 -> claude-3-haiku
-            simplified_name = "-".join(parts[:3])
-            return f"anthropic/{simplified_name}"
-        return f"anthropic/{model_id}"
-
-    # Handle OpenAI models
-    if "gpt" in model_id:
-        return f"openai/{model_id}"
+    for marker, normalize in _MODEL_RULES:
+        if marker in model_id:
+            return normalize(model_id)
 
     # Return original if no specific rule matches
     return model_id
 
 
+# Streamed chunks are buffered in a bounded queue between the upstream reader and
+# the client; a client that leaves it full for SSE_QUEUE_TIMEOUT seconds is dropped
+SSE_MAX_QUEUE_SIZE = int(os.getenv("SSE_MAX_QUEUE_SIZE", "256"))
+SSE_QUEUE_TIMEOUT = float(os.getenv("SSE_QUEUE_TIMEOUT", "5.0"))
+# A comment event is sent when upstream has been silent this many seconds
+SSE_PING_INTERVAL = float(os.getenv("SSE_PING_INTERVAL", "15"))
+SSE_PING = b": ping\n\n"
+SSE_RESPONSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Stops nginx-style reverse proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+async def _read_upstream(response: httpx.Response, queue: asyncio.Queue, stop: asyncio.Event) -> None:
+    """
+    Copy upstream chunks into the queue, ending with None, until stop is set.
+    On failure (including a slow client) buffered chunks are dropped and the
+    exception is queued instead.
+    """
+    try:
+        async for chunk in response.aiter_bytes():
+            # The timed put (a Task and timer per call) is only needed when full
+            if queue.full():
+                await asyncio.wait_for(queue.put(chunk), timeout=SSE_QUEUE_TIMEOUT)
+            else:
+                queue.put_nowait(chunk)
+            # wait_for can swallow a cancel that lands as the put completes
+            # (Python < 3.12), so cancellation alone may not stop this loop
+            if stop.is_set():
+                return
+        await asyncio.wait_for(queue.put(None), timeout=SSE_QUEUE_TIMEOUT)
+    except Exception as e:
+        if stop.is_set():
+            return
+        if isinstance(e, asyncio.TimeoutError):
+            logger.warning("Slow client: stream queue full for %ss, closing upstream stream", SSE_QUEUE_TIMEOUT)
+            await response.aclose()
+            e = ConnectionAbortedError("Client is not reading the stream")
+        # Whatever is still buffered will never be sent; make room for the error
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(e)
+
+
+# Full prompts (chat history, RAG documents) are only sent to Langfuse on request;
+# by default a generation records a size summary of its messages instead
+LANGFUSE_FULL_INPUT = os.getenv("LANGFUSE_FULL_INPUT", "").lower() in ("1", "true", "yes")
+
+
+def _content_chars(content: Any) -> int:
+    """Length of a message's content, either a string or a list of content parts."""
+    if isinstance(content, str):
+        return len(content)
+    if isinstance(content, list):
+        return sum(len(part.get("text") or "") for part in content if isinstance(part, dict))
+    return 0
+
+
+def _langfuse_input(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Input and metadata arguments for the Langfuse generation of a request."""
+    messages = request_data.get("messages", [])
+    if LANGFUSE_FULL_INPUT:
+        return {"input": messages, "metadata": request_data}
+    return {
+        "input": {
+            "n_messages": len(messages),
+            "chars": sum(_content_chars(m.get("content")) for m in messages if isinstance(m, dict)),
+        },
+        "metadata": {k: v for k, v in request_data.items() if k != "messages"},
+    }
+
+
 async def proxy_chat_completion(
     request_data: Dict[str, Any],
     session_id: Optional[str] = None
-) -> AsyncGenerator[str, None]:
+) -> AsyncGenerator[bytes, None]:
     """
     Proxy chat completion request to OpenRouter with Langfuse observability.
+    request_data is sent upstream as-is; callers strip proxy-only fields (response_format).
     """
     # Normalize model name before processing
     original_model = None
@@ -139,193 +303,181 @@ async def proxy_chat_completion(
         original_model = request_data["model"]
         normalized_model = normalize_model_name(original_model)
         request_data["model"] = normalized_model
-        print(f"Normalized model name from '{original_model}' to '{normalized_model}'")
-
-    trace = langfuse.trace(
-        name="chat-completion-proxy",
-        session_id=session_id,
-        metadata={
-            "streaming": request_data.get("stream", False),
-            "model": request_data.get("model"),
-            "original_model": original_model,
-        }
-    )
-    generation = trace.generation(
-        name="openrouter-generation",
-        model=request_data.get("model", "unknown"),
-        input=request_data.get("messages", []),
-        metadata=request_data,
+        logger.debug("Normalized model name from '%s' to '%s'", original_model, normalized_model)
+
+    # Langfuse calls run in the background worker; this only identifies the generation
+    generation = object()
+    record_langfuse(
+        "start",
+        generation,
+        trace=dict(
+            name="chat-completion-proxy",
+            session_id=session_id,
+            metadata={
+                "streaming": request_data.get("stream", False),
+                "model": request_data.get("model"),
+                "original_model": original_model,
+            }
+        ),
+        generation=dict(
+            name="openrouter-generation",
+            model=request_data.get("model", "unknown"),
+            **_langfuse_input(request_data),
+        ),
     )
 
     try:
-        openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
-        if not openrouter_api_key:
-            raise ValueError("Server configuration error: Missing OPENROUTER_API_KEY")
-
-        headers = {
-            "Authorization": f"Bearer {openrouter_api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": os.getenv("HTTP_REFERER", "http://localhost:8000"),
-            "X-Title": os.getenv("X_TITLE", "Graphiti Proxy Server")
-        }
-        if session_id:
-            headers["X-Session-Id"] = session_id
+        headers = {**OPENROUTER_HEADERS, "X-Session-Id": session_id} if session_id else OPENROUTER_HEADERS
 
-        filtered_request = {k: v for k, v in request_data.items() if k != "response_format"}
-        print(f"Proxying request to OpenRouter: {json.dumps(filtered_request, indent=2)}")
+        if DEBUG:
+            logger.debug("Proxying request to OpenRouter: %s", orjson.dumps(request_data).decode())
 
+        # Encoded once with orjson; httpx's json= would re-encode with stdlib json
+        body = orjson.dumps(request_data)
         output_content = ""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            if filtered_request.get("stream", False):
-                async with client.stream("POST", "https://openrouter.ai/api/v1/chat/completions", headers=headers, json=filtered_request) as response:
-                    if response.status_code != 200:
-                        error_text = await response.aread()
-                        raise HTTPException(status_code=response.status_code, detail=f"OpenRouter API Error: {error_text.decode()}")
-                    
-                    async for chunk in response.aiter_lines():
-                        if chunk:
-                            yield chunk + "\\n\\n"
-                            if chunk.startswith("data: "):
-                                data_part = chunk[6:]
-                                if data_part.strip() == "[DONE]":
-                                    break
-                                try:
-                                    chunk_data = json.loads(data_part)
-                                    if "choices" in chunk_data and chunk_data["choices"]:
-                                        delta = chunk_data["choices"][0].get("delta", {})
-                                        if "content" in delta and delta["content"] is not None:
-                                            output_content += delta["content"]
-                                except json.JSONDecodeError:
-                                    continue
-                generation.update(output=output_content)
-            else:
-                response = await client.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=filtered_request)
+        client = app.state.http_client
+        if request_data.get("stream", False):
+            async with client.stream("POST", OPENROUTER_CHAT_COMPLETIONS_URL, headers=headers, content=body) as response:
                 if response.status_code != 200:
-                    raise HTTPException(status_code=response.status_code, detail=f"OpenRouter API Error: {response.text}")
-                
-                response_data = response.json()
-                if "choices" in response_data and response_data["choices"]:
-                    message = response_data["choices"][0].get("message", {})
-                    output_content = message.get("content", "")
+                    error_text = await response.aread()
+                    raise HTTPException(status_code=response.status_code, detail=f"OpenRouter API Error: {error_text.decode()}")
                 
-                generation.update(output=output_content, usage=response_data.get("usage"))
-                yield json.dumps(response_data)
+                # Forward upstream bytes verbatim (already SSE-framed); frames are only
+                # parsed on the side to collect the output for Langfuse
+                collector = SSEContentCollector()
+                queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_MAX_QUEUE_SIZE)
+                stop = asyncio.Event()
+                reader = asyncio.create_task(_read_upstream(response, queue, stop))
+                at_frame_boundary = True
+                try:
+                    while True:
+                        try:
+                            if queue.empty():
+                                chunk = await asyncio.wait_for(queue.get(), timeout=SSE_PING_INTERVAL)
+                            else:
+                                chunk = queue.get_nowait()
+                        except asyncio.TimeoutError:
+                            # Keep idle connections alive through proxies; a comment is
+                            # only valid between events, never inside a half-sent one
+                            if at_frame_boundary:
+                                yield SSE_PING
+                            continue
+                        if chunk is None:
+                            break
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        yield chunk
+                        at_frame_boundary = chunk.endswith((b"\n\n", b"\r\n\r\n", b"\r\r"))
+                        collector.feed(chunk)
+                finally:
+                    # Client went away or the stream failed: stop reading upstream
+                    stop.set()
+                    reader.cancel()
+                    await asyncio.gather(reader, return_exceptions=True)
+                output_content = collector.content
+            record_langfuse("update", generation, output=output_content)
+        else:
+            response = await client.post(OPENROUTER_CHAT_COMPLETIONS_URL, headers=headers, content=body)
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail=f"OpenRouter API Error: {response.text}")
+            
+            response_data = orjson.loads(response.content)
+            if "choices" in response_data and response_data["choices"]:
+                message = response_data["choices"][0].get("message", {})
+                output_content = message.get("content", "")
+            
+            record_langfuse("update", generation, output=output_content, usage=response_data.get("usage"))
+            yield orjson.dumps(response_data)
 
     except Exception as e:
-        generation.update(level="ERROR", status_message=str(e))
-        print(f"Error in proxy_chat_completion: {e}")
+        record_langfuse("update", generation, level="ERROR", status_message=str(e))
+        logger.error("Error in proxy_chat_completion: %s", e)
         # Re-raise as HTTPException to be handled by FastAPI
         if isinstance(e, HTTPException):
             raise
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        record_langfuse("close", generation)
+
+async def _dispatch(request_data: Dict[str, Any], session_id: Optional[str]) -> Response:
+    """Proxy a parsed request, as an SSE stream or a single JSON response."""
+    if request_data.get("stream", False):
+        logger.debug("Streaming request detected. Initiating SSE response.")
+        return StreamingResponse(
+            proxy_chat_completion(request_data, session_id),
+            media_type="text/event-stream",
+            headers=SSE_RESPONSE_HEADERS,
+        )
+
+    logger.debug("Non-streaming request detected. Sending full JSON response.")
+
+    # For non-streaming, there's only one chunk; closing the generator right away
+    # runs its cleanup now instead of whenever it is garbage collected
+    completion = proxy_chat_completion(request_data, session_id)
+    try:
+        response_content = await anext(completion)
+    finally:
+        await completion.aclose()
+
+    return Response(
+        content=response_content,
+        media_type="application/json",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
 
 # @app.post("/chat/completions", dependencies=[Depends(get_api_key)])
 @app.post("/chat/completions")
 async def chat_completions(request: Request):
     """Handle requests to /chat/completions endpoint."""
-    print("Handling /chat/completions request")
+    logger.debug("Handling /chat/completions request")
     
     try:
-        request_data = await request.json()
-        print(f"Original received payload: {json.dumps(request_data, indent=2)}")
+        request_data = orjson.loads(await request.body())
+        if DEBUG:
+            logger.debug("Original received payload: %s", orjson.dumps(request_data).decode())
         
-        # Extract session ID from response_format.type if present
+        # Extract session ID from response_format.type if present. The field only
+        # carries the session ID, so it is removed before proxying upstream.
         session_id = None
-        if "response_format" in request_data and isinstance(request_data["response_format"], dict):
-            session_id = request_data["response_format"].get("type")
+        response_format = request_data.pop("response_format", None)
+        if isinstance(response_format, dict):
+            session_id = response_format.get("type")
             if session_id:
-                print(f"Extracted session ID: {session_id}")
+                logger.debug("Extracted session ID: %s", session_id)
         
-        is_streaming = request_data.get("stream", False)
-        
-        if is_streaming:
-            print("Streaming request detected. Initiating SSE response.")
-            
-            async def generate_stream():
-                async for chunk in proxy_chat_completion(request_data, session_id):
-                    yield chunk
-            
-            return StreamingResponse(
-                generate_stream(),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                }
-            )
-        else:
-            print("Non-streaming request detected. Sending full JSON response.")
-            
-            response_content = ""
-            async for chunk in proxy_chat_completion(request_data, session_id):
-                response_content = chunk  # For non-streaming, there's only one chunk
-                break
-            
-            return Response(
-                content=response_content,
-                media_type="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-            
-    except json.JSONDecodeError:
+        return await _dispatch(request_data, session_id)
+
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in request body")
     except Exception as e:
-        print(f"Error in chat_completions: {e}")
+        logger.error("Error in chat_completions: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/v1/messages")
 async def messages(request: Request):
     """Handle requests to Anthropic-compatible /v1/messages endpoint."""
-    print("Handling /v1/messages request for Anthropic compatibility")
+    logger.debug("Handling /v1/messages request for Anthropic compatibility")
     
     try:
-        request_data = await request.json()
-        print(f"Original received payload for /v1/messages: {json.dumps(request_data, indent=2)}")
+        request_data = orjson.loads(await request.body())
+        if DEBUG:
+            logger.debug("Original received payload for /v1/messages: %s", orjson.dumps(request_data).decode())
         
         # For Anthropic, session_id might be in metadata if the client supports it.
         # n8n often passes a user_id here, which we can use for session tracking.
         session_id = request_data.get("metadata", {}).get("user_id")
         if session_id:
-            print(f"Extracted session ID from metadata: {session_id}")
-        
-        is_streaming = request_data.get("stream", False)
+            logger.debug("Extracted session ID from metadata: %s", session_id)
+        # Never forwarded upstream (same as /chat/completions)
+        request_data.pop("response_format", None)
         
-        if is_streaming:
-            print("Streaming request detected. Initiating SSE response.")
-            
-            async def generate_stream():
-                async for chunk in proxy_chat_completion(request_data, session_id):
-                    yield chunk
-            
-            return StreamingResponse(
-                generate_stream(),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                }
-            )
-        else:
-            print("Non-streaming request detected. Sending full JSON response.")
-            
-            response_content = ""
-            async for chunk in proxy_chat_completion(request_data, session_id):
-                response_content = chunk  # For non-streaming, there's only one chunk
-                break
-            
-            return Response(
-                content=response_content,
-                media_type="application/json",
-                headers={"Access-Control-Allow-Origin": "*"}
-            )
-            
-    except json.JSONDecodeError:
+        return await _dispatch(request_data, session_id)
+
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in request body")
     except Exception as e:
-        print(f"Error in /v1/messages endpoint: {e}")
+        logger.error("Error in /v1/messages endpoint: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -347,10 +499,16 @@ async def root():
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
+    # Each worker is a separate process with its own HTTP client and Langfuse
+    # queue, flushed by its own lifespan shutdown
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
     uvicorn.run(
         "server:app",
         host="0.0.0.0",
         port=port,
-        reload=True,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        reload=False,
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Collects the streamed completion text from SSE bytes forwarded by the proxy.
+"""
+
+import re
+
+import orjson
+
+# SSE allows CRLF, LF or CR line endings; an event ends at the first blank line
+SSE_FRAME_SEPARATOR = re.compile(rb"\r\n\r\n|\n\n|\r\r")
+
+
+def _sse_delta_contents(frame: bytes) -> list[str]:
+    """Return the delta content strings carried by one SSE frame."""
+    contents = []
+    for line in frame.splitlines():
+        if not line.startswith(b"data: "):
+            continue
+        try:
+            chunk_data = orjson.loads(line[6:])
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(chunk_data, dict) and chunk_data.get("choices"):
+            delta = chunk_data["choices"][0].get("delta", {})
+            if delta.get("content") is not None:
+                contents.append(delta["content"])
+    return contents
+
+
+class SSEContentCollector:
+    """
+    Accumulates delta content from SSE chunks split at arbitrary byte offsets.
+    Everything after the `data: [DONE]` event is ignored.
+    """
+
+    __slots__ = ("_buffer", "_parts", "done")
+
+    def __init__(self) -> None:
+        self._buffer = b""
+        self._parts: list[str] = []
+        self.done = False
+
+    def feed(self, chunk: bytes) -> None:
+        if self.done:
+            return
+        self._buffer += chunk
+        *frames, self._buffer = SSE_FRAME_SEPARATOR.split(self._buffer)
+        for frame in frames:
+            # Cheap byte checks first: nothing after [DONE] is parsed, and
+            # keep-alive comments and frames without content never reach orjson
+            if frame.startswith(b"data: [DONE]"):
+                self.done = True
+                self._buffer = b""
+                return
+            if not frame.startswith(b":") and b'"content"' in frame:
+                self._parts.extend(_sse_delta_contents(frame))
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
@@ -16,12 +16,13 @@ if [ -z "$LANGFUSE_SECRET_KEY" ] || [ -z "$LANGFUSE_PUBLIC_KEY" ]; then
     exit 1
 fi
 
-# Set default port if not specified
+# Set default port and worker count if not specified
 PORT=${PORT:-8000}
+WEB_CONCURRENCY=${WEB_CONCURRENCY:-1}
 
 echo "Starting OpenRouter Proxy Server with Langfuse observability..."
 echo "Server will be available at: http://localhost:$PORT"
 echo "Health check: http://localhost:$PORT/health"
 
 # Start the server
-uvicorn server:app --host 0.0.0.0 --port $PORT --reload
+uvicorn server:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools --workers $WEB_CONCURRENCY
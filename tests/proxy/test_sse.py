@@ -0,0 +1,86 @@
+"""
+Copyright 2024, Zep Software, Inc.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+# Running tests: pytest -xvs tests/proxy/test_sse.py
+
+import pytest
+
+pytest.importorskip('orjson')
+
+from observability_proxy_server.sse import SSEContentCollector  # noqa: E402
+
+
+def _stream(eol: bytes) -> bytes:
+    events = [
+        b': OPENROUTER PROCESSING',
+        b'data: {"choices":[{"delta":{"role":"assistant","content":""}}]}',
+        b'data: {"choices":[{"delta":{"content":"Hello"}}]}',
+        b'data: {"choices":[{"delta":{"content":", w\\u00f6rld"}}]}',
+        b'data: {"choices":[{"delta":{}}],"usage":{"total_tokens":3}}',
+        b'data: [DONE]',
+        b'data: {"choices":[{"delta":{"content":"ignored"}}]}',
+    ]
+    return b''.join(event + eol + eol for event in events)
+
+
+EXPECTED = 'Hello, wörld'
+LINE_ENDINGS = [pytest.param(b'\n', id='lf'), pytest.param(b'\r\n', id='crlf'), pytest.param(b'\r', id='cr')]
+
+
+@pytest.mark.parametrize('eol', LINE_ENDINGS)
+def test_single_chunk(eol):
+    collector = SSEContentCollector()
+    collector.feed(_stream(eol))
+    assert collector.content == EXPECTED
+    assert collector.done
+
+
+@pytest.mark.parametrize('eol', LINE_ENDINGS)
+def test_split_at_every_offset(eol):
+    data = _stream(eol)
+    for offset in range(len(data) + 1):
+        collector = SSEContentCollector()
+        collector.feed(data[:offset])
+        collector.feed(data[offset:])
+        assert collector.content == EXPECTED, offset
+        assert collector.done, offset
+
+
+@pytest.mark.parametrize('eol', LINE_ENDINGS)
+def test_byte_by_byte(eol):
+    data = _stream(eol)
+    collector = SSEContentCollector()
+    for i in range(len(data)):
+        collector.feed(data[i : i + 1])
+    assert collector.content == EXPECTED
+    assert collector.done
+
+
+def test_not_done_without_done_event():
+    collector = SSEContentCollector()
+    collector.feed(b'data: {"choices":[{"delta":{"content":"partial"}}]}\n\n')
+    collector.feed(b'data: {"choices":[{"delta":{"content":"cut')
+    assert collector.content == 'partial'
+    assert not collector.done
+
+
+def test_malformed_and_comment_frames_are_ignored():
+    collector = SSEContentCollector()
+    collector.feed(b': "content" in a comment\n\n')
+    collector.feed(b'data: {"content": not json}\n\n')
+    collector.feed(b'data: ["content"]\n\n')
+    collector.feed(b'data: {"choices":[{"delta":{"content":"ok"}}]}\n\n')
+    assert collector.content == 'ok'